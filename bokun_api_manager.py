@@ -20,76 +20,434 @@ Uses the correct REST v2 /experience/{id}/components endpoint
 to set availability rules properly via API
 """
 
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
 from flask_cors import CORS
-import requests
+import orjson
+import httpx
 import base64
+import brotli
+import gzip
 import hashlib
 import hmac
 import os
+import threading
+import time
+from functools import lru_cache, partial, wraps
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-import json
+from cachetools import TTLCache
+import redis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+import logging
+import re
 
 load_dotenv()
 
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
+log = logging.getLogger(__name__)
+# httpx logs every request at INFO; only surface its warnings
+logging.getLogger('httpx').setLevel(logging.WARNING)
+# BOKUN_TRACE=1 turns on extra diagnostic Bokun calls that production never needs
+BOKUN_TRACE = bool(os.getenv('BOKUN_TRACE'))
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify() and request.json"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
 CORS(app)
 
 @app.after_request
 def add_header(response):
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    # Routes that are safe to cache set their own Cache-Control; everything else is no-store
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
     return response
 
 
 
-BOKUN_ACCESS_KEY = os.getenv('BOKUN_ACCESS_KEY', 'b048bb24bc604475aaa503ac29f9caae')
-BOKUN_SECRET_KEY = os.getenv('BOKUN_SECRET_KEY', '0bd28b4cff1340749168428d675f6b2a')
+BOKUN_ACCESS_KEY = os.getenv('BOKUN_ACCESS_KEY')
+BOKUN_SECRET_KEY = os.getenv('BOKUN_SECRET_KEY')
+if not BOKUN_ACCESS_KEY or not BOKUN_SECRET_KEY:
+    raise RuntimeError('BOKUN_ACCESS_KEY and BOKUN_SECRET_KEY must be set (environment or .env)')
 BOKUN_BASE_URL = 'https://api.bokun.io'
-
-def get_bokun_headers(method, path):
-    """Generate HMAC-SHA1 auth headers for Bokun API"""
-    date_str = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-    signature_string = f"{date_str}{BOKUN_ACCESS_KEY}{method.upper()}{path}"
-    raw_sig = hmac.new(
-        BOKUN_SECRET_KEY.encode(),
-        signature_string.encode(),
-        hashlib.sha1
-    ).digest()
-    signature = base64.b64encode(raw_sig).decode("utf-8")
+# Keyed HMAC state computed once; copying it skips the key setup on every signature
+_SECRET_BYTES = BOKUN_SECRET_KEY.encode()
+_ACCESS_BYTES = BOKUN_ACCESS_KEY.encode()
+_HMAC_TEMPLATE = hmac.new(_SECRET_BYTES, digestmod=hashlib.sha1)
+# Bound as a default argument in the signing hot path so lookups are local, not global
+_HEADERS_CTX = (BOKUN_ACCESS_KEY, _ACCESS_BYTES, _HMAC_TEMPLATE)
+
+# Shared HTTP/2 client so concurrent Bokun calls multiplex over one kept-alive connection.
+# The transport retries failed connects; transient HTTP statuses are retried in _with_retries.
+CLIENT = httpx.Client(
+    base_url=BOKUN_BASE_URL,
+    # Explicit bounds so a slow Bokun node can't tie up a worker: 3s to connect, 10s per read/write
+    timeout=httpx.Timeout(10.0, connect=3.0),
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=3,
+        # Over HTTP/2 concurrent calls share one connection; the cap only bounds an HTTP/1.1 fallback
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=16)
+    )
+)
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.2
+
+# Redis cache shared by all workers for Bokun GETs. It is best-effort: if Redis
+# is unreachable every lookup is simply a miss.
+REDIS = redis.Redis(
+    host=os.getenv('REDIS_HOST', 'localhost'),
+    decode_responses=True,
+    socket_connect_timeout=0.25,
+    socket_timeout=0.25,
+    retry=Retry(NoBackoff(), 0)   # fail fast to a miss instead of backing off on every call
+)
+# Redis TTL in seconds for each cacheable GET, matched against the request path
+CACHE_TTLS = (
+    ('componentType=AVAILABILITY_RULES', 15),
+    ('componentType=BOOKING_TYPE', 300),
+    ('/activity.json/', 300),   # start times and titles
+)
+# Last good copy of each cacheable GET, served if Bokun is down
+STALE_TTL = 24 * 60 * 60
+# Cached keys are tagged with their experience so a write can drop all of them at once
+EXPERIENCE_ID_RE = re.compile(r'/(?:experience|activity\.json)/(\d+)')
+
+# Bokun paths, relative to CLIENT's base_url. Call with eid= (and comp= for components).
+_ACTIVITY_PATH = '/activity.json/{eid}'.format
+_COMPONENT_PATH = '/restapi/v2.0/experience/{eid}/components?componentType={comp}'.format
+_AVAIL_RULES_PATH = '/restapi/v2.0/experience/{eid}/components?componentType=AVAILABILITY_RULES'.format
+
+# GETs currently being fetched from Bokun, keyed by path, so identical concurrent calls share one request
+INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+# Booking type and start times change on a human timescale, so they are memoized per
+# experience for 5 minutes (see per_experience_cache). Adding availability rules changes
+# neither, so add_availability_rule does not invalidate them.
+BOOKING_TYPE_CACHE = TTLCache(maxsize=64, ttl=300)
+START_TIMES_CACHE = TTLCache(maxsize=64, ttl=300)
+
+# Zero-padded hour/minute strings for start time labels, looked up instead of formatted
+H2 = tuple(f'{h:02d}' for h in range(24))
+M2 = tuple(f'{m:02d}' for m in range(60))
+
+# Experience titles rarely change - keep the serialized /api/experiences (etag, body) for 10 minutes.
+# TTLCache is not thread-safe, so access goes through EXP_CACHE_LOCK. Adding availability
+# rules never changes titles, so add_availability_rule does not invalidate it; use ?refresh=1.
+EXP_CACHE = TTLCache(maxsize=4, ttl=600)
+EXP_CACHE_LOCK = threading.Lock()
+
+def _sign(date_str, method, path, _ctx=_HEADERS_CTX):
+    """HMAC-SHA1 signature for a request. method must already be uppercase ('GET', 'PUT', 'POST')."""
+    _, access_bytes, hmac_template = _ctx
+    h = hmac_template.copy()
+    h.update(date_str.encode() + access_bytes + method.encode() + path.encode())
+    raw_sig = h.digest()
+    return base64.b64encode(raw_sig).decode('ascii')
+
+@lru_cache(maxsize=256)
+def _headers_cached(sec, method, path, _ctx=_HEADERS_CTX):
+    """Signed headers for one wall-clock second; entries fall out naturally as sec moves on.
+    The dict is shared between callers and must not be modified."""
+    date_str = datetime.fromtimestamp(sec, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
     return {
         'X-Bokun-Date': date_str,
-        'X-Bokun-AccessKey': BOKUN_ACCESS_KEY,
-        'X-Bokun-Signature': signature,
+        'X-Bokun-AccessKey': _ctx[0],
+        'X-Bokun-Signature': _sign(date_str, method, path),
         'Content-Type': 'application/json'
     }
 
-def bokun_get(path):
-    """GET request to Bokun API"""
-    url = f'{BOKUN_BASE_URL}{path}'
-    headers = get_bokun_headers('GET', path)
-    response = requests.get(url, headers=headers)
-    return response
+def get_bokun_headers(method, path):
+    """Generate HMAC-SHA1 auth headers for Bokun API (identical calls within a second share one signature)"""
+    return _headers_cached(int(time.time()), method, path)
+
+def _with_retries(send):
+    """Call send() again with exponential backoff while Bokun returns a transient status"""
+    for attempt in range(RETRY_TOTAL):
+        response = send()
+        if response.status_code not in RETRY_STATUSES:
+            return response
+        time.sleep(RETRY_BACKOFF * (2 ** attempt))
+    return send()
+
+def _cache_ttl(path):
+    """Redis TTL for a GET path, or None if the path is not cached"""
+    for marker, ttl in CACHE_TTLS:
+        if marker in path:
+            return ttl
+    return None
+
+def redis_cached(fetch):
+    """Serve cacheable Bokun GETs from Redis, storing successful responses for their TTL.
+    If Bokun fails (5xx or no connection) the last good copy is returned with X-Cache: stale.
+    Pass use_cache=False to skip the lookup and the stale fallback (the fresh response is still stored);
+    the fetch is then told not to coalesce, so it can't join a GET that started before a recent write."""
+    @wraps(fetch)
+    def wrapper(path, use_cache=True, **kwargs):
+        if kwargs.get('client') is not None:
+            # Cache keys don't include the client, so a caller-supplied one always goes straight to Bokun
+            return fetch(path, coalesce=False, **kwargs)
+        if not use_cache:
+            kwargs['coalesce'] = False
+        ttl = _cache_ttl(path)
+        if ttl is None:
+            return fetch(path, **kwargs)
+        key = f'bokun:{path}'
+        if use_cache:
+            try:
+                cached = REDIS.get(key)
+            except redis.RedisError:
+                cached = None
+            if cached is not None:
+                return httpx.Response(200, text=cached, headers={'X-Cache': 'hit'})
+        error = None
+        try:
+            response = fetch(path, **kwargs)
+        except httpx.TransportError as exc:
+            response, error = None, exc
+        if use_cache and (error or response.status_code >= 500):
+            try:
+                stale = REDIS.get(f'stale:{path}')
+            except redis.RedisError:
+                stale = None
+            if stale is not None:
+                return httpx.Response(200, text=stale, headers={'X-Cache': 'stale'})
+        if error:
+            raise error
+        if response.status_code == 200:
+            try:
+                pipe = REDIS.pipeline()
+                pipe.setex(key, ttl, response.text)
+                pipe.setex(f'stale:{path}', STALE_TTL, response.text)
+                match = EXPERIENCE_ID_RE.search(path)
+                if match:
+                    tag = f'tag:exp:{match.group(1)}'
+                    pipe.sadd(tag, key)
+                    pipe.expire(tag, max(t for _, t in CACHE_TTLS))
+                pipe.execute()
+            except redis.RedisError:
+                pass
+        return response
+    return wrapper
+
+def invalidate_experience(experience_id):
+    """Drop every cached GET tagged with this experience after it changes in Bokun"""
+    tag = f'tag:exp:{experience_id}'
+    try:
+        keys = REDIS.smembers(tag)
+        REDIS.delete(*keys, tag)
+    except redis.RedisError:
+        pass
 
-def bokun_put(path, payload):
-    """PUT request to Bokun API"""
-    url = f'{BOKUN_BASE_URL}{path}'
-    headers = get_bokun_headers('PUT', path)
-    response = requests.put(url, json=payload, headers=headers)
-    return response
+def refresh_stale_copy(path, text):
+    """Replace the stale fallback for path with a known-good body (e.g. what a PUT just saved)"""
+    try:
+        REDIS.setex(f'stale:{path}', STALE_TTL, text)
+    except redis.RedisError:
+        pass
+
+def is_stale(response):
+    """True if response is a last good copy that redis_cached served because Bokun was failing"""
+    return response.headers.get('X-Cache') == 'stale'
+
+def single_flight(fetch):
+    """Coalesce concurrent identical GETs: the first caller talks to Bokun, the others wait for its result.
+    coalesce=False always makes a fresh call of its own (e.g. the read of a read-modify-write)."""
+    @wraps(fetch)
+    def wrapper(path, coalesce=True, **kwargs):
+        if not coalesce or kwargs.get('client') is not None:   # INFLIGHT is keyed by path only
+            return fetch(path, **kwargs)
+        with _INFLIGHT_LOCK:
+            future = INFLIGHT.get(path)
+            leader = future is None
+            if leader:
+                future = INFLIGHT[path] = Future()
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(fetch(path, **kwargs))
+        except BaseException as exc:   # waiters must never hang, whatever the failure
+            future.set_exception(exc)
+        finally:
+            with _INFLIGHT_LOCK:
+                del INFLIGHT[path]
+        return future.result()
+    return wrapper
+
+def _bokun_request(method, path, content=None, client=None):
+    """Signed request to Bokun API (client defaults to the shared CLIENT)"""
+    client = client or CLIENT
+    return client.request(method, path, content=content, headers=get_bokun_headers(method, path))
+
+@redis_cached
+@single_flight
+def bokun_get(path, client=None):
+    """GET request to Bokun API. Passing a client skips the Redis cache and single-flight coalescing."""
+    return _with_retries(lambda: _bokun_request('GET', path, client=client))
+
+def bokun_put(path, payload, client=None):
+    """PUT request to Bokun API (payload may already be serialized bytes)"""
+    body = payload if isinstance(payload, bytes) else orjson.dumps(payload)   # reused by every retry
+    return _with_retries(lambda: _bokun_request('PUT', path, body, client))
+
+def bokun_post(path, payload, client=None):
+    """POST request to Bokun API (not retried, POST is not idempotent)"""
+    return _bokun_request('POST', path, orjson.dumps(payload), client)
+
+def per_experience_cache(cache):
+    """Memoize a lookup keyed by experience_id in a TTLCache. None means Bokun failed and is not cached.
+    use_cache=False skips the memo (and is passed on to fn); the fresh value still replaces the cached one."""
+    lock = threading.Lock()
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(experience_id, use_cache=True):
+            value = None
+            if use_cache:
+                with lock:
+                    value = cache.get(experience_id)
+            if value is None:
+                value = fn(experience_id, use_cache=use_cache)
+                if value is not None:
+                    with lock:
+                        cache[experience_id] = value
+            return value
+        return wrapper
+    return decorator
+
+def _pad2(value, table):
+    """Two-digit label for an hour/minute from its lookup table, formatting anything outside the table"""
+    if type(value) is int and 0 <= value < len(table):
+        return table[value]
+    return str(value).zfill(2)
+
+@per_experience_cache(BOOKING_TYPE_CACHE)
+def _get_booking_type(experience_id, use_cache=True):
+    """Booking type of an experience - the AVAILABILITY_RULES component doesn't include it"""
+    resp = bokun_get(_COMPONENT_PATH(eid=experience_id, comp='BOOKING_TYPE'), use_cache=use_cache)
+    if resp.status_code != 200:
+        return None
+    return orjson.loads(resp.content).get('bookingType', 'DATE_ONLY')
+
+@per_experience_cache(START_TIMES_CACHE)
+def _get_start_times(experience_id, use_cache=True):
+    """Start time IDs and HH:MM labels from the activity detail (v1), which has the real time IDs"""
+    resp = bokun_get(_ACTIVITY_PATH(eid=experience_id), use_cache=use_cache)
+    if resp.status_code != 200:
+        return None
+    # Only startTimes is needed from the (large) activity document
+    raw_times = orjson.loads(resp.content).get('startTimes', [])
+    return [{'id': st['id'], 'label': _pad2(st['hour'], H2) + ':' + _pad2(st['minute'], M2)} for st in raw_times]
+
+def _clean_rule(rule, with_times):
+    """Reduce an existing availability rule to the fields Bokun accepts back on PUT.
+    with_times is set for DATE_AND_TIME experiences, whose start times are kept."""
+    cleaned_rule = {
+        'recurrenceRule': rule['recurrenceRule'],
+        'maxCapacity': rule['maxCapacity'],
+        'maxCapacityForPickup': rule.get('maxCapacityForPickup', rule.get('maxCapacity', 12)),
+        'minTotalPax': rule.get('minTotalPax', 1),
+        'guidedLanguages': rule.get('guidedLanguages', []),
+    }
 
-def bokun_post(path, payload):
-    """POST request to Bokun API"""
-    url = f'{BOKUN_BASE_URL}{path}'
-    headers = get_bokun_headers('POST', path)
-    response = requests.post(url, json=payload, headers=headers)
-    return response
+    # Ensure maxCapacityForPickup is >= 1
+    if cleaned_rule['maxCapacityForPickup'] < 1:
+        cleaned_rule['maxCapacityForPickup'] = cleaned_rule['maxCapacity']
+
+    # Copy id if exists (for existing rules)
+    if 'id' in rule:
+        cleaned_rule['id'] = rule['id']
+
+    if with_times:
+        # startTimes was already reduced to bare ids by _normalize_start_times
+        if rule['startTimes']:
+            cleaned_rule['startTimes'] = rule['startTimes']
+            cleaned_rule['allStartTimes'] = False
+        else:
+            cleaned_rule['allStartTimes'] = True
+    return cleaned_rule
+
+def _normalize_start_times(rules):
+    """Validate startTimes once as rules come in from Bokun, keeping ONLY the id of each start time"""
+    for rule in rules:
+        start_times = rule.get('startTimes')
+        rule['startTimes'] = [
+            {'id': st['id']} for st in start_times if isinstance(st, dict) and st.get('id')
+        ] if isinstance(start_times, list) else []
+
+def gather(*calls, return_exceptions=False):
+    """Run zero-argument callables concurrently and return their results in order.
+    Like asyncio.gather for this sync app: total wait is the slowest call, not the sum.
+    Each call gets its own thread (a greenlet under gevent), so concurrent requests never queue
+    behind a shared pool. With return_exceptions=True a failed call's exception is returned in its place."""
+    with ThreadPoolExecutor(max_workers=len(calls) or 1) as pool:
+        futures = [pool.submit(call) for call in calls]
+    if return_exceptions:
+        return [f.exception() or f.result() for f in futures]
+    return [f.result() for f in futures]
+
+def serialize_json(payload):
+    """Serialize payload once, returning (etag, body) for cacheable_bytes"""
+    body = orjson.dumps(payload)
+    return hashlib.blake2b(body, digest_size=8).hexdigest(), body
+
+def cacheable_bytes(etag, body, max_age=10):
+    """Pre-serialized JSON response with an ETag and short private caching; answers 304 when the client's copy still matches"""
+    resp = app.response_class(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = f'private, max-age={max_age}, must-revalidate'
+    return resp.make_conditional(request)
+
+def cacheable_json(payload, max_age=10):
+    """Like cacheable_bytes, for a payload that still needs serializing"""
+    return cacheable_bytes(*serialize_json(payload), max_age=max_age)
+
+def stale_json(payload):
+    """JSON response built from a stale Bokun copy: marked X-Cache: stale, with no ETag and no caching"""
+    resp = jsonify(payload)
+    resp.headers['X-Cache'] = 'stale'
+    return resp
+
+# The page is static, so it is read and pre-compressed once at startup
+with open(os.path.join(app.static_folder, 'index.html'), 'rb') as f:
+    _INDEX_BYTES = f.read()
+_INDEX_VARIANTS = {
+    'br': brotli.compress(_INDEX_BYTES),
+    'gzip': gzip.compress(_INDEX_BYTES, 6),
+}
+_INDEX_ETAG = hashlib.blake2b(_INDEX_BYTES, digest_size=8).hexdigest()
 
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    # Cacheable by the browser for 5 minutes
+    encoding = request.accept_encodings.best_match(list(_INDEX_VARIANTS))
+    resp = app.response_class(_INDEX_VARIANTS.get(encoding, _INDEX_BYTES), mimetype='text/html')
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'public, max-age=300'
+    resp.set_etag(f'{_INDEX_ETAG}-{encoding or "identity"}')
+    return resp.make_conditional(request)
 
 @app.route('/api/experiences', methods=['GET'])
 def get_experiences():
@@ -99,38 +457,84 @@ def get_experiences():
             1084194, 1087988, 1088027, 1113923, 1113953,
             1113957, 1113944, 1113948, 1124650, 1111734
         ]
-        all_items = []
-        for eid in experience_ids:
-            resp = bokun_get(f'/activity.json/{eid}')
-            if resp.status_code == 200:
-                e = resp.json()
-                all_items.append({'id': e['id'], 'title': e['title']})
-                print(f'  [{e["id"]}] {e["title"]}')
+        key = tuple(experience_ids)
+        use_cache = request.args.get('refresh') != '1'
+        if use_cache:
+            with EXP_CACHE_LOCK:
+                cached = EXP_CACHE.get(key)
+            if cached is not None:
+                return cacheable_bytes(*cached)
+
+        # Try one batched search first; only IDs it doesn't return are looked up one by one
+        titles = {}
+        try:
+            search_resp = bokun_post('/activity.json/search', {'ids': experience_ids, 'fields': ['id', 'title']})
+        except httpx.HTTPError as e:
+            # The search is only a shortcut - if it fails every ID goes through the per-ID path below
+            log.warning('Search ERROR %r', e)
+        else:
+            if search_resp.status_code == 200:
+                try:
+                    items = orjson.loads(search_resp.content).get('items', [])
+                except (orjson.JSONDecodeError, AttributeError):
+                    log.warning('Search returned an unexpected body: %.100s', search_resp.text)
+                    items = []
+                for e in items:
+                    try:
+                        eid, title = int(e['id']), e['title']
+                    except (KeyError, TypeError, ValueError):
+                        continue   # malformed item - its ID is left to the per-ID path
+                    if eid in experience_ids:
+                        titles[eid] = title
             else:
-                print(f'  [{eid}] ERROR {resp.status_code}: {resp.text[:100]}')
-        print(f'\nLoaded {len(all_items)} experiences')
-        return jsonify({'success': True, 'experiences': all_items})
+                log.warning('Search ERROR %s: %.100s', search_resp.status_code, search_resp.text)
+        missing = [eid for eid in experience_ids if eid not in titles]
+
+        # Fetch the rest concurrently - total time is one round trip, not one per experience
+        stale = False
+        if missing:
+            results = gather(*(partial(bokun_get, _ACTIVITY_PATH(eid=eid), use_cache=use_cache) for eid in missing))
+            for eid, resp in zip(missing, results):
+                if resp.status_code == 200:
+                    titles[eid] = orjson.loads(resp.content)['title']
+                    stale = stale or is_stale(resp)
+                else:
+                    log.warning('[%s] ERROR %s: %.100s', eid, resp.status_code, resp.text)
+        all_items = [{'id': eid, 'title': titles[eid]} for eid in experience_ids if eid in titles]
+        if log.isEnabledFor(logging.DEBUG):
+            for e in all_items:
+                log.debug('[%s] %s', e['id'], e['title'])
+        log.info('Loaded %d experiences', len(all_items))
+        response_dict = {'success': True, 'experiences': all_items}
+        if stale:
+            return stale_json(response_dict)
+        etag, body = serialize_json(response_dict)
+        # Only cache a complete list so a transient Bokun error isn't served for 10 minutes
+        if len(all_items) == len(experience_ids):
+            with EXP_CACHE_LOCK:
+                EXP_CACHE[key] = (etag, body)
+        return cacheable_bytes(etag, body)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/get-start-times/<int:experience_id>', methods=['GET'])
 def get_start_times(experience_id):
-    """Get start times for an experience by checking multiple component types"""
+    """Get start times for an experience from the activity detail (v1), which has the real time IDs"""
     try:
-        components_to_try = ['RATES', 'DEFAULT_OPENING_HOURS', 'BOOKING_TYPE']
-        for comp in components_to_try:
-            path = f'/restapi/v2.0/experience/{experience_id}/components?componentType={comp}'
-            response = bokun_get(path)
-            print(f'{comp} -> {response.status_code}: {response.text[:300]}')
-
-        # The start times with IDs live in the activity detail endpoint (v1)
-        path_v1 = f'/activity.json/{experience_id}'
-        response_v1 = bokun_get(path_v1)
-        print(f'Activity detail {response_v1.status_code}: {response_v1.text[:500]}')
+        if BOKUN_TRACE:
+            # Diagnostic only: dump the v2 components that might also carry start times
+            components_to_try = ['RATES', 'DEFAULT_OPENING_HOURS', 'BOOKING_TYPE']
+            probes = gather(*(partial(bokun_get, _COMPONENT_PATH(eid=experience_id, comp=comp))
+                              for comp in components_to_try))
+            for comp, response in zip(components_to_try, probes):
+                log.info('%s -> %s: %.300s', comp, response.status_code, response.text)
+
+        response_v1 = bokun_get(_ACTIVITY_PATH(eid=experience_id))
+        log.debug('Activity detail %s', response_v1.status_code)
         if response_v1.status_code == 200:
-            data = response_v1.json()
+            data = orjson.loads(response_v1.content)
             start_times = data.get('startTimes', data.get('departureTimes', []))
-            print(f'Start times from activity detail: {start_times}')
+            log.debug('Start times from activity detail: %s', start_times)
             return jsonify({'success': True, 'startTimes': start_times, 'raw': data.get('startTimes', [])})
 
         return jsonify({'success': True, 'startTimes': []})
@@ -141,40 +545,44 @@ def get_start_times(experience_id):
 def get_availability_rules(experience_id):
     """Get current availability rules for an experience"""
     try:
-        path = f'/restapi/v2.0/experience/{experience_id}/components?componentType=AVAILABILITY_RULES'
-        response = bokun_get(path)
+        path = _AVAIL_RULES_PATH(eid=experience_id)
+        # All three only need the experience id, so fetch them together. The start times are
+        # speculative - they are discarded for DATE_ONLY experiences, and are cached for next time anyway.
+        response, booking_type, start_times = gather(
+            partial(bokun_get, path),
+            partial(_get_booking_type, experience_id),
+            partial(_get_start_times, experience_id),
+            return_exceptions=True
+        )
+        for result in (response, booking_type):
+            if isinstance(result, Exception):
+                raise result
+        if isinstance(start_times, Exception):
+            # A failed speculative fetch only matters if the start times are actually needed
+            if booking_type == 'DATE_AND_TIME':
+                raise start_times
+            start_times = None
 
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             rules = data.get('availabilityRules', [])
 
-            # Fetch booking type separately - AVAILABILITY_RULES component doesn't include it
-            bt_resp = bokun_get(f'/restapi/v2.0/experience/{experience_id}/components?componentType=BOOKING_TYPE')
-            if bt_resp.status_code == 200:
-                booking_type = bt_resp.json().get('bookingType', 'DATE_ONLY')
-            else:
-                booking_type = 'DATE_ONLY'
+            booking_type = booking_type or 'DATE_ONLY'
+            if booking_type != 'DATE_AND_TIME' or start_times is None:
+                start_times = []
 
-            # Fetch start times from activity detail (v1) - this has the real time IDs and labels
-            start_times = []
-            if booking_type == 'DATE_AND_TIME':
-                detail_resp = bokun_get(f'/activity.json/{experience_id}')
-                if detail_resp.status_code == 200:
-                    detail = detail_resp.json()
-                    raw_times = detail.get('startTimes', [])
-                    start_times = [{
-                        'id':    st['id'],
-                        'label': f"{str(st['hour']).zfill(2)}:{str(st['minute']).zfill(2)}"
-                    } for st in raw_times]
-
-            print(f'Booking type: {booking_type}')
-            print(f'Start times: {start_times}')
-            return jsonify({
+            log.debug('Booking type: %s', booking_type)
+            log.debug('Start times: %s', start_times)
+            payload = {
                 'success': True,
                 'rules': rules,
                 'bookingType': booking_type,
                 'startTimes': start_times
-            })
+            }
+            if is_stale(response):
+                return stale_json(payload)
+            # 15s lets the browser reuse a prefetched response if the experience is picked soon after
+            return cacheable_json(payload, max_age=15)
         return jsonify({'success': False, 'error': f'{response.status_code}: {response.text}'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -193,15 +601,11 @@ def add_availability_rule():
         booking_type   = data.get('booking_type', 'DATE_ONLY')
         start_time_ids = data.get('start_time_ids', [])
         all_start_times = data.get('all_start_times', True)
-        # For a single date, start and end are the same day
-        start_date     = date
-        end_date       = date
-        weekdays       = []
-        months         = []
 
         # Step 1: Fetch existing components so we keep everything intact
-        path = f'/restapi/v2.0/experience/{experience_id}/components?componentType=AVAILABILITY_RULES'
-        get_resp = bokun_get(path)
+        path = _AVAIL_RULES_PATH(eid=experience_id)
+        # Never read-modify-write from cache - a stale list would overwrite newer rules
+        get_resp = bokun_get(path, use_cache=False)
 
         if get_resp.status_code != 200:
             return jsonify({
@@ -209,32 +613,23 @@ def add_availability_rule():
                 'error': f'Could not fetch existing rules: {get_resp.status_code} {get_resp.text}'
             }), 400
 
-        existing = get_resp.json()
+        existing = orjson.loads(get_resp.content)
         existing_rules = existing.get('availabilityRules', [])
         
-        # Fetch booking type separately - AVAILABILITY_RULES component doesn't include it
-        bt_resp = bokun_get(f'/restapi/v2.0/experience/{experience_id}/components?componentType=BOOKING_TYPE')
-        if bt_resp.status_code == 200:
-            api_booking_type = bt_resp.json().get('bookingType', 'DATE_ONLY')
-        else:
-            api_booking_type = 'DATE_ONLY'
-        
-        print(f'Existing rules from API: {existing_rules}')
-        print(f'API Booking Type: {api_booking_type}')
+        # Uncached like the rules: a stale DATE_ONLY would strip the start times from every rule
+        api_booking_type = _get_booking_type(experience_id, use_cache=False) or 'DATE_ONLY'
+        with_times = api_booking_type == 'DATE_AND_TIME'
+        if with_times:
+            _normalize_start_times(existing_rules)
 
-        # Step 2: Build the new rule
-        recurrence_rule = {
-            'startDate': start_date,
-            'endDate':   end_date,
-        }
-        if weekdays:
-            recurrence_rule['byWeekday'] = weekdays
-        if months:
-            recurrence_rule['byMonth'] = months
+        log.debug('Existing rules from API: %s', existing_rules)
+        log.debug('API Booking Type: %s', api_booking_type)
 
+        # Step 2: Build the new rule
         new_rule = {
             # No 'id' field = create new rule
-            'recurrenceRule':       recurrence_rule,
+            # For a single date, start and end are the same day
+            'recurrenceRule':       {'startDate': date, 'endDate': date},
             'maxCapacity':          capacity,
             'maxCapacityForPickup': capacity,
             'minTotalPax':          1,
@@ -247,76 +642,30 @@ def add_availability_rule():
                 # User selected specific times
                 new_rule['allStartTimes'] = False
                 new_rule['startTimes'] = [{'id': sid} for sid in start_time_ids]
-                print(f'Adding specific times: {start_time_ids}')
+                log.debug('Adding specific times: %s', start_time_ids)
             else:
                 # No times selected, add all
                 new_rule['allStartTimes'] = True
-                print('Adding all start times')
-
-        # Step 3: Clean existing rules before sending back - DEEP COPY via JSON
-        clean_existing = []
-        print(f'*** CLEANING {len(existing_rules)} RULES, api_booking_type={api_booking_type} ***')
-        for rule in existing_rules:
-            # Deep copy via JSON to ensure no references remain
-            rule_copy = json.loads(json.dumps(rule))
-            
-            # Create a completely new rule object to avoid reference issues
-            cleaned_rule = {
-                'recurrenceRule': rule_copy['recurrenceRule'],
-                'maxCapacity': rule_copy['maxCapacity'],
-                'maxCapacityForPickup': rule_copy.get('maxCapacityForPickup', rule_copy.get('maxCapacity', 12)),
-                'minTotalPax': rule_copy.get('minTotalPax', 1),
-                'guidedLanguages': rule_copy.get('guidedLanguages', []),
-            }
-            
-            # Ensure maxCapacityForPickup is >= 1
-            if cleaned_rule['maxCapacityForPickup'] < 1:
-                cleaned_rule['maxCapacityForPickup'] = cleaned_rule['maxCapacity']
-            
-            # Copy id if exists (for existing rules)
-            if 'id' in rule_copy:
-                cleaned_rule['id'] = rule_copy['id']
-            
-            # For DATE_AND_TIME experiences, handle start times
-            if api_booking_type == 'DATE_AND_TIME':
-                if rule_copy.get('startTimes') and isinstance(rule_copy['startTimes'], list) and len(rule_copy['startTimes']) > 0:
-                    # Extract ONLY the id from each start time
-                    cleaned_times = []
-                    for st in rule_copy['startTimes']:
-                        if isinstance(st, dict) and 'id' in st and st['id']:
-                            cleaned_times.append({'id': st['id']})  # NEW dict with ONLY id
-                    
-                    if cleaned_times:
-                        cleaned_rule['startTimes'] = cleaned_times
-                        cleaned_rule['allStartTimes'] = False
-                    else:
-                        cleaned_rule['allStartTimes'] = True
-                else:
-                    cleaned_rule['allStartTimes'] = True
-            
-            clean_existing.append(cleaned_rule)
-
-        updated_rules = clean_existing + [new_rule]
-
-        # DEBUG: Print ALL rules being sent
-        print(f'\n=== SENDING {len(updated_rules)} RULES TO BOKUN ===')
-        for i, r in enumerate(updated_rules):
-            print(f'Rule {i}:')
-            print(f'  allStartTimes: {r.get("allStartTimes")}')
-            print(f'  startTimes: {r.get("startTimes")}')
-            if r.get("startTimes"):
-                for j, st in enumerate(r["startTimes"]):
-                    print(f'    startTime[{j}]: {st}')
-        print(f'================================\n')
-
-        put_payload = {
-            'availabilityRules': updated_rules
-        }
+                log.debug('Adding all start times')
+
+        # Step 3: Reduce existing rules to the fields we send back and serialize everything in one pass
+        log.debug('Cleaning %d rules, api_booking_type=%s', len(existing_rules), api_booking_type)
+        updated_rules = [*(_clean_rule(rule, with_times) for rule in existing_rules), new_rule]
 
-        put_resp = bokun_put(path, put_payload)
+        # Per-rule dump only when DEBUG is on - skip the loop entirely otherwise
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Sending %d rules to Bokun', len(updated_rules))
+            for i, r in enumerate(updated_rules):
+                log.debug('Rule %d: allStartTimes=%s startTimes=%s', i, r.get('allStartTimes'), r.get('startTimes'))
+
+        put_body = orjson.dumps({'availabilityRules': updated_rules})
+        put_resp = bokun_put(path, put_body)
 
         if put_resp.status_code == 200:
-            result = put_resp.json()
+            invalidate_experience(experience_id)
+            # The PUT response is the saved rule list - make it the fallback too, not the pre-add copy
+            refresh_stale_copy(path, put_resp.text)
+            result = orjson.loads(put_resp.content)
             saved_rules = result.get('availabilityRules', [])
             return jsonify({
                 'success': True,
@@ -334,629 +683,6 @@ def add_availability_rule():
         return jsonify({'success': False, 'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
-HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Aquaholics Boat Booking App v3</title>
-    <style>
-        * { 
-            box-sizing: border-box;
-            -webkit-tap-highlight-color: transparent;
-        }
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;
-            background: #f8f9fa;
-            min-height: 100vh;
-            padding: 0;
-            margin: 0;
-        }
-        
-        /* Header removed - back to inline style */
-        
-        .container { 
-            max-width: 100%; 
-            margin: 0;
-            padding: 0;
-            width: 100%;
-        }
-        
-        .card {
-            background: white;
-            border-radius: 0;
-            padding: 24px 20px;
-            margin-bottom: 0;
-            border-bottom: 8px solid #f8f9fa;
-        }
-        
-        /* Step header */
-        .step-header {
-            display: flex;
-            align-items: center;
-            margin-bottom: 20px;
-        }
-        .step-number {
-            width: 44px;
-            height: 44px;
-            background: #1d57c7;
-            color: white;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-weight: 700;
-            font-size: 22px;
-            margin-right: 14px;
-            flex-shrink: 0;
-        }
-        h2 {
-            font-size: 20px;
-            color: #2E3645;
-            margin: 0;
-            font-weight: 700;
-        }
-        
-        /* Form elements */
-        .form-group { margin-bottom: 20px; }
-        label {
-            display: block;
-            font-size: 17px;
-            font-weight: 600;
-            color: #444;
-            margin-bottom: 10px;
-        }
-        
-        select, input[type="date"], input[type="number"] {
-            width: 100%;
-            padding: 18px;
-            border: 2px solid #e2e8f0;
-            border-radius: 14px;
-            font-size: 18px;
-            background: white;
-            color: #2E3645;
-            -webkit-appearance: none;
-            appearance: none;
-        }
-        
-        select {
-            background-image: url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='14' height='10' viewBox='0 0 14 10'%3E%3Cpath fill='%231d57c7' d='M7 10L0 0h14z'/%3E%3C/svg%3E");
-            background-repeat: no-repeat;
-            background-position: right 16px center;
-            padding-right: 50px;
-        }
-        
-        select:focus, input:focus {
-            outline: none;
-            border-color: #1d57c7;
-            box-shadow: 0 0 0 3px rgba(29,87,199,0.1);
-        }
-        
-        /* Time checkboxes - CUSTOM DESIGN */
-        #timeGroup { display: none; }
-        #timeGroup.show { display: block; }
-        
-        #startTimesList {
-            display: flex;
-            flex-direction: column;
-            gap: 12px;
-        }
-        
-        .time-option {
-            position: relative;
-            display: block;
-        }
-        
-        .time-option input[type="checkbox"] {
-            position: absolute;
-            opacity: 0;
-            width: 0;
-            height: 0;
-        }
-        
-        .time-label {
-            display: flex;
-            align-items: center;
-            gap: 16px;
-            padding: 22px;
-            background: #f8f9fa;
-            border: 3px solid #e2e8f0;
-            border-radius: 16px;
-            cursor: pointer;
-            transition: all 0.2s;
-            user-select: none;
-        }
-        
-        .time-option input[type="checkbox"]:checked + .time-label {
-            background: #e8f0fe;
-            border-color: #1d57c7;
-        }
-        
-        .time-option input[type="checkbox"]:checked + .time-label .custom-checkbox {
-            background: #1d57c7;
-            border-color: #1d57c7;
-        }
-        
-        .time-option input[type="checkbox"]:checked + .time-label .custom-checkbox::after {
-            display: block;
-        }
-        
-        .custom-checkbox {
-            width: 34px;
-            height: 34px;
-            min-width: 34px;
-            border: 3px solid #cbd5e1;
-            border-radius: 10px;
-            background: white;
-            position: relative;
-            transition: all 0.2s;
-        }
-        
-        .custom-checkbox::after {
-            content: '';
-            position: absolute;
-            display: none;
-            left: 8px;
-            top: 3px;
-            width: 6px;
-            height: 12px;
-            border: solid white;
-            border-width: 0 3px 3px 0;
-            transform: rotate(45deg);
-        }
-        
-        .time-text {
-            font-size: 21px;
-            font-weight: 700;
-            color: #1d57c7;
-        }
-        
-        /* Buttons */
-        .btn {
-            width: 100%;
-            padding: 18px;
-            border: none;
-            border-radius: 14px;
-            font-size: 18px;
-            font-weight: 700;
-            cursor: pointer;
-            transition: all 0.2s;
-            margin-top: 10px;
-        }
-        
-        .btn-primary {
-            background: #1d57c7;
-            color: white;
-        }
-        
-        .btn-primary:active {
-            background: #164aab;
-            transform: scale(0.98);
-        }
-        
-        /* Status messages */
-        .status {
-            padding: 16px;
-            border-radius: 12px;
-            margin-top: 16px;
-            font-size: 15px;
-            display: none;
-            line-height: 1.5;
-        }
-        .status.show { display: block; }
-        .status.success {
-            background: #10b981;
-            border: none;
-            color: white;
-            font-size: 22px;
-            font-weight: 700;
-            white-space: pre-line;
-            text-align: center;
-            padding: 24px 20px;
-            border-radius: 14px;
-            box-shadow: 0 4px 16px rgba(16, 185, 129, 0.4);
-            animation: slideIn 0.3s ease-out;
-        }
-        
-        @keyframes slideIn {
-            from {
-                transform: translateY(-20px);
-                opacity: 0;
-            }
-            to {
-                transform: translateY(0);
-                opacity: 1;
-            }
-        }
-        .status.error {
-            background: #fee2e2;
-            border-left: 4px solid #ef4444;
-            color: #7f1d1d;
-        }
-        .status.info {
-            background: #dbeafe;
-            border-left: 4px solid #3b82f6;
-            color: #1e3a8a;
-        }
-        
-        /* Collapsible availability */
-        #rulesSection { display: none; }
-        .toggle-bar {
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            padding: 16px;
-            background: #f0f4ff;
-            border-radius: 12px;
-            border: 2px solid #c7d7f9;
-            margin-top: 12px;
-            user-select: none;
-        }
-        .toggle-bar span:first-child {
-            font-weight: 600;
-            color: #1d57c7;
-            font-size: 15px;
-        }
-        .toggle-icon {
-            color: #1d57c7;
-            font-size: 16px;
-            transition: transform 0.2s;
-        }
-        
-        /* Time groups */
-        .time-group {
-            margin-bottom: 12px;
-        }
-        .time-group-header {
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            padding: 20px;
-            background: linear-gradient(135deg, #1d57c7 0%, #0a2d6e 100%);
-            border-radius: 12px;
-            margin-bottom: 8px;
-            user-select: none;
-            -webkit-tap-highlight-color: transparent;
-        }
-        .time-group-header span:first-child {
-            font-weight: 700;
-            color: white;
-            font-size: 20px;
-        }
-        .time-group-header .toggle-icon {
-            color: white;
-            font-size: 16px;
-        }
-        .time-group-content {
-            padding-left: 8px;
-            padding-right: 8px;
-        }
-        #rulesList {
-            display: none;
-            margin-top: 12px;
-        }
-        .rule-item {
-            background: #f8fafc;
-            border: 1px solid #e2e8f0;
-            border-radius: 10px;
-            padding: 14px;
-            margin-bottom: 10px;
-            font-size: 14px;
-            color: #444;
-            line-height: 1.6;
-        }
-        .rule-item strong { color: #1d57c7; }
-        
-        /* Log card */
-        #logCard { display: none; }
-        #logCard.show { display: block; }
-        #addedLog .rule-item {
-            font-size: 15px;
-            padding: 14px;
-        }
-        
-        /* Warning message */
-        .no-times-msg {
-            display: none;
-            color: #e67e22;
-            font-size: 14px;
-            padding: 12px;
-            background: #fef9e7;
-            border-radius: 10px;
-            margin-top: 12px;
-        }
-        
-/* Desktop adjustments */
-        @media (min-width: 768px) {
-            .container { max-width: 600px; margin: 0 auto; }
-            .card { border-radius: 16px; margin: 20px; border-bottom: none; }
-        }
-    </style>
-</head>
-<body>
-<div style="background: linear-gradient(135deg, #1d57c7 0%, #0a2d6e 100%); padding: 28px 20px; text-align: center; position: sticky; top: 0; z-index: 100; box-shadow: 0 2px 12px rgba(0,0,0,0.15);">
-    <h1 style="color: white; font-size: 32px; margin: 0; font-weight: 700;">🌊 Aquaholics Boat Booking</h1>
-</div>
-<div class="container">
-
-    <!-- Experience Selector -->
-    <div class="card">
-        <h2>1. Select Experience</h2>
-        <div class="form-group">
-            <label>Experience</label>
-            <select id="experience" onchange="loadRules()">
-                <option value="">Loading experiences...</option>
-            </select>
-        </div>
-        <div id="rulesSection" style="display:none">
-            <div class="toggle-bar" onclick="toggleRules()">
-                <span> Current Availability</span>
-                <span id="rulesToggleIcon" class="toggle-icon"></span>
-            </div>
-            <div id="rulesList" class="rules-list" style="display:none;margin-top:4px"></div>
-        </div>
-    </div>
-
-    <!-- Add Availability -->
-    <div class="card">
-        <h2>2. Add Availability for a Date</h2>
-        <div class="form-group">
-            <label>Select Date</label>
-            <input type="date" id="date">
-        </div>
-        <div class="form-group" id="timeGroup" style="display:none">
-            <label>Start Times</label>
-            <div id="startTimesList"></div>
-            <div id="noTimesMsg" style="display:none;color:#e67e22;font-size:13px;padding:8px;background:#fef9e7;border-radius:6px;margin-top:8px">
-                 No start times configured on this experience in Bokun yet.
-            </div>
-        </div>
-        <div class="form-group">
-            <label>Capacity</label>
-            <input type="number" id="capacity" value="12" min="1">
-        </div>
-        <button class="btn btn-primary" onclick="addRule()"> Add This Date</button>
-        <div id="status" class="status"></div>
-    </div>
-
-    <!-- Added Dates Log -->
-    <div class="card" id="logCard" style="display:none">
-        <h2> Dates Added This Session</h2>
-        <div id="addedLog"></div>
-    </div>
-</div>
-
-<script>
-    let bookingType = 'DATE_ONLY';
-    let addedDates  = [];
-
-    async function loadExperiences() {
-        const resp = await fetch('/api/experiences');
-        const data = await resp.json();
-        const sel  = document.getElementById('experience');
-        if (data.success) {
-            sel.innerHTML = '<option value="">-- Select an experience --</option>';
-            data.experiences.forEach(e => {
-                const opt = document.createElement('option');
-                opt.value = e.id;
-                opt.textContent = e.title;
-                sel.appendChild(opt);
-            });
-        }
-    }
-
-    async function loadRules() {
-        const id = document.getElementById('experience').value;
-        if (!id) return;
-
-        addedDates = [];
-        document.getElementById('logCard').style.display = 'none';
-        document.getElementById('addedLog').innerHTML = '';
-
-        showStatus('Loading current availability...', 'info');
-        const resp = await fetch(`/api/get-availability-rules/${id}`);
-        const data = await resp.json();
-
-        const section = document.getElementById('rulesSection');
-        const list    = document.getElementById('rulesList');
-        section.style.display = 'block';
-
-        if (data.success) {
-            bookingType = data.bookingType || 'DATE_ONLY';
-
-            // Handle start times display
-            const timeGroup    = document.getElementById('timeGroup');
-            const timesList    = document.getElementById('startTimesList');
-            const noTimesMsg   = document.getElementById('noTimesMsg');
-
-            if (bookingType === 'DATE_AND_TIME') {
-                timeGroup.style.display = 'block';
-                if (data.startTimes && data.startTimes.length > 0) {
-                    noTimesMsg.style.display = 'none';
-                    // Group times into Morning (before 11:30) and Afternoon (11:30+)
-                    const morningTimes = data.startTimes.filter(st => {
-                        const [hours, mins] = st.label.split(':').map(Number);
-                        const totalMins = hours * 60 + mins;
-                        return totalMins < 690; // 11:30 = 690 minutes
-                    });
-                    const afternoonTimes = data.startTimes.filter(st => {
-                        const [hours, mins] = st.label.split(':').map(Number);
-                        const totalMins = hours * 60 + mins;
-                        return totalMins >= 690;
-                    });
-                    
-                    let html = '';
-                    if (morningTimes.length > 0) {
-                        html += `<div class="time-group">
-                            <div class="time-group-header" onclick="toggleTimeGroup('morning')">
-                                <span> Morning (6:00am - 11:30am)</span>
-                                <span id="morning-icon" class="toggle-icon"></span>
-                            </div>
-                            <div id="morning-times" class="time-group-content" style="display:none">
-                                ${morningTimes.map(st => 
-                                    `<div class="time-option">
-                                        <input type="checkbox" id="time-${st.id}" value="${st.id}">
-                                        <label for="time-${st.id}" class="time-label">
-                                            <div class="custom-checkbox"></div>
-                                            <span class="time-text">${st.label}</span>
-                                        </label>
-                                    </div>`
-                                ).join('')}
-                            </div>
-                        </div>`;
-                    }
-                    
-                    if (afternoonTimes.length > 0) {
-                        html += `<div class="time-group">
-                            <div class="time-group-header" onclick="toggleTimeGroup('afternoon')">
-                                <span> Afternoon (11:30am onwards)</span>
-                                <span id="afternoon-icon" class="toggle-icon"></span>
-                            </div>
-                            <div id="afternoon-times" class="time-group-content" style="display:none">
-                                ${afternoonTimes.map(st => 
-                                    `<div class="time-option">
-                                        <input type="checkbox" id="time-${st.id}" value="${st.id}">
-                                        <label for="time-${st.id}" class="time-label">
-                                            <div class="custom-checkbox"></div>
-                                            <span class="time-text">${st.label}</span>
-                                        </label>
-                                    </div>`
-                                ).join('')}
-                            </div>
-                        </div>`;
-                    }
-                    
-                    timesList.innerHTML = html;
-                } else {
-                    timesList.innerHTML = '';
-                    noTimesMsg.style.display = 'block';
-                }
-            } else {
-                timeGroup.style.display = 'none';
-                timesList.innerHTML = '';
-            }
-
-            // Show existing rules
-            if (data.rules.length === 0) {
-                list.innerHTML = '<div class="rule-item">No availability dates yet.</div>';
-            } else {
-                list.innerHTML = data.rules.map(r => {
-                    const start = r.recurrenceRule?.startDate || '?';
-                    const end   = r.recurrenceRule?.endDate   || '?';
-                    const label = start === end ? ` ${start}` : ` ${start}  ${end}`;
-                    return `<div class="rule-item">
-                        ${label} &nbsp;|&nbsp; Capacity: <strong>${r.maxCapacity}</strong>
-                        ${r.recurrenceRule?.byWeekday?.length ? `&nbsp;|&nbsp; ${r.recurrenceRule.byWeekday.join(', ')}` : ''}
-                    </div>`;
-                }).join('');
-            }
-            hideStatus();
-        } else {
-            list.innerHTML = `<div class="rule-item" style="color:#ef4444">${data.error}</div>`;
-            hideStatus();
-        }
-    }
-
-    async function addRule() {
-        const experienceId = document.getElementById('experience').value;
-        const date         = document.getElementById('date').value;
-        const capacity     = parseInt(document.getElementById('capacity').value);
-
-        if (!experienceId) return showStatus('Please select an experience', 'error');
-        if (!date)         return showStatus('Please select a date', 'error');
-
-        // Collect checked start times for DATE_AND_TIME experiences
-        const checkedBoxes    = [...document.querySelectorAll('#startTimesList input[type=checkbox]:checked')];
-        const selectedTimeIds = checkedBoxes.map(cb => parseInt(cb.value));
-        const selectedLabels  = checkedBoxes.map(cb => {
-            const label = cb.nextElementSibling;
-            const timeText = label.querySelector('.time-text');
-            return timeText ? timeText.textContent.trim() : '';
-        });
-
-        // DEBUG: Show what's selected on screen
-        if (bookingType === 'DATE_AND_TIME') {
-            showStatus(`DEBUG: ${checkedBoxes.length} time(s) checked: ${selectedLabels.join(', ')}`, 'info');
-            await new Promise(resolve => setTimeout(resolve, 2000)); // Wait 2 seconds so you can see it
-        }
-
-        if (bookingType === 'DATE_AND_TIME' && selectedTimeIds.length === 0) {
-            return showStatus('Please select at least one start time', 'error');
-        }
-
-        showStatus('Adding date...', 'info');
-
-        const resp = await fetch('/api/add-availability-rule', {
-            method:  'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                experience_id:   parseInt(experienceId),
-                date:            date,
-                capacity:        capacity,
-                booking_type:    bookingType,
-                start_time_ids:  selectedTimeIds,
-                all_start_times: selectedTimeIds.length === 0,
-            })
-        });
-        const data = await resp.json();
-
-        if (data.success) {
-            const timeLabel = selectedLabels.length ? ` at ${selectedLabels.join(', ')}` : '';
-            showStatus(`✅ TRIP ADDED!\n📅 ${date}${timeLabel}\n👥 ${capacity} spaces`, 'success');
-            
-            // Auto-hide success message after 4 seconds
-            setTimeout(() => hideStatus(), 5000);
-            
-            addedDates.push({ date, timeLabel, capacity });
-            document.getElementById('logCard').style.display = 'block';
-            document.getElementById('addedLog').innerHTML = addedDates.map(d =>
-                `<div class="rule-item"> <strong>${d.date}</strong>${d.timeLabel} &nbsp;|&nbsp; Capacity: <strong>${d.capacity}</strong></div>`
-            ).join('');
-            // Jump to next day
-            const next = new Date(date);
-            next.setDate(next.getDate() + 1);
-            document.getElementById('date').value = next.toISOString().split('T')[0];
-            loadRules();
-        } else {
-            showStatus(' ' + data.error, 'error');
-        }
-    }
-
-    function showStatus(msg, type) {
-        const s = document.getElementById('status');
-        s.textContent = msg;
-        s.className = `status show ${type}`;
-    }
-    function hideStatus() {
-        document.getElementById('status').className = 'status';
-    }
-
-    function toggleRules() {
-        const list = document.getElementById('rulesList');
-        const icon = document.getElementById('rulesToggleIcon');
-        const isHidden = list.style.display === 'none';
-        list.style.display = isHidden ? 'block' : 'none';
-        icon.textContent = isHidden ? '' : '';
-    }
-
-    function toggleTimeGroup(group) {
-        const content = document.getElementById(group + '-times');
-        const icon = document.getElementById(group + '-icon');
-        if (content && icon) {
-            const isHidden = content.style.display === 'none';
-            content.style.display = isHidden ? 'block' : 'none';
-            icon.textContent = isHidden ? '' : '';
-        }
-    }
-
-    document.getElementById('date').value = new Date().toISOString().split('T')[0];
-    loadExperiences();
-</script>
-</body>
-</html>
-'''
-
 if __name__ == '__main__':
     print("\n" + "="*60)
     print(" BOKUN AVAILABILITY MANAGER - API VERSION")
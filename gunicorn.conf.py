@@ -0,0 +1,16 @@
+"""
+Gunicorn settings for the Procfile (gunicorn also picks this file up by default)
+"""
+import os
+
+# Handlers spend nearly all their time waiting on Bokun, so each worker runs green
+# threads instead of one blocking request at a time
+worker_class = 'gevent'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_connections = 100
+
+# No preload_app: the gevent worker monkey-patches sockets and threading when it starts,
+# and the app must be imported after that. With preload the app would be imported in the
+# master first, and its httpx client, Redis pool and thread pool would hold unpatched objects.
+# Each worker therefore imports the app itself and builds its own caches and page bytes.
+preload_app = False